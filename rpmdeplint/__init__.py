@@ -4,14 +4,13 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from __future__ import absolute_import
-
 import os, os.path
 from collections import defaultdict
-import binascii
+import concurrent.futures
+import functools
 import logging
-import six
-from six.moves import map
+import multiprocessing
+import threading
 import solv
 import rpm
 import ctypes
@@ -42,6 +41,26 @@ installonlypkgs = [
 ]
 
 
+def _cached(cache_name, key):
+    """
+    Decorator for methods whose results are stored in the dict attribute 
+    called *cache_name*, keyed by calling *key* with the method arguments.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            cache = getattr(self, cache_name)
+            cache_key = key(*args)
+            try:
+                return cache[cache_key]
+            except KeyError:
+                pass
+            result = cache[cache_key] = method(self, *args)
+            return result
+        return wrapper
+    return decorator
+
+
 class UnreadablePackageError(Exception):
     """
     Raised if an RPM package cannot be read from disk (it's corrupted, or the 
@@ -50,21 +69,34 @@ class UnreadablePackageError(Exception):
     pass
 
 
+class _PackageDeps(object):
+    """
+    Dependencies and problems for a single package in a :py:class:`DependencySet`.
+    """
+
+    __slots__ = ('dependencies', 'problems')
+
+    def __init__(self):
+        self.dependencies = []
+        self.problems = []
+
+
 class DependencySet(object):
     """
     Contains dependency information from trying to install the packages under test.
     """
 
     def __init__(self):
-        self._packagedeps = defaultdict(lambda: dict(dependencies=[],problems=[]))
+        self._packagedeps = defaultdict(_PackageDeps)
         self._packages_with_problems = set()
         self._overall_problems = set()
 
     def add_package(self, pkg, dependencies, problems):
         nevra = str(pkg)
-        self._packagedeps[nevra]['dependencies'].extend(map(str, dependencies))
+        deps = self._packagedeps[nevra]
+        deps.dependencies.extend([str(d) for d in dependencies])
         if len(problems) != 0:
-            self._packagedeps[nevra]['problems'].extend(problems)
+            deps.problems.extend(problems)
             self._packages_with_problems.add(nevra)
             self._overall_problems.update(problems)
 
@@ -91,7 +123,8 @@ class DependencySet(object):
         """
         Dict in the form {package: {'dependencies': list of packages, 'problems': list of problems}}
         """
-        return dict(self._packagedeps)
+        return dict((nevra, {'dependencies': deps.dependencies, 'problems': deps.problems})
+                    for nevra, deps in self._packagedeps.items())
 
 
 class DependencyAnalyzer(object):
@@ -109,10 +142,18 @@ class DependencyAnalyzer(object):
         :param packages: An iterable of RPM package paths to be tested
         """
         # delayed import to avoid circular dependency
-        from rpmdeplint.repodata import RepoDownloadError
+        from rpmdeplint.repodata import RepoDownloadError, clean_cache
 
         self.pool = solv.Pool()
         self.pool.setarch(arch)
+        # Ids of the solvable attributes we look up, which are fixed for the 
+        # lifetime of the pool.
+        self._checksum_key = self.pool.str2id('solvable:checksum')
+        self._filelist_key = self.pool.str2id('solvable:filelist')
+        self._mediabase_key = self.pool.str2id('solvable:mediabase')
+        self._obsoletes_key = self.pool.str2id('solvable:obsoletes')
+        self._recommends_key = self.pool.str2id('solvable:recommends')
+        self._requires_key = self.pool.str2id('solvable:requires')
 
         #: List of :py:class:`solv.Solvable` to be tested (corresponding to *packages* parameter)
         self.solvables = []
@@ -124,11 +165,27 @@ class DependencyAnalyzer(object):
                 raise UnreadablePackageError('Failed to read package: %s'
                         % self.pool.errstr)
             self.solvables.append(solvable)
+        # For fast membership tests
+        self._solvables_set = set(self.solvables)
 
         self.repos_by_name = {}  #: Mapping of {repo name: :py:class:`rpmdeplint.repodata.Repo`}
-        for repo in repos:
+        # Filelists are by far the largest part of the repodata, and we only 
+        # need them to check for file conflicts, or if some package depends on 
+        # a file which is not listed in primary. So loading them is deferred 
+        # until then. This is a list of (solv.Repo, Repo) still to be loaded.
+        self._pending_filelists = []
+        repos = list(repos)
+        # Expire old cache entries once up front, rather than having every 
+        # download thread scan the cache at the same time.
+        clean_cache()
+        # Downloading repodata is mostly spent waiting on the network, so we 
+        # download all repos in parallel. Loading them into the pool is not 
+        # thread-safe, so that happens here once every download has finished, 
+        # in the original order.
+        downloads = self._download_all_repodata(repos)
+        for repo, download in zip(repos, downloads):
             try:
-                repo.download_repodata()
+                download.result()
             except RepoDownloadError as e:
                 if repo.skip_if_unavailable:
                     logger.warn('Skipping repo %s: %s', repo.name, e)
@@ -136,15 +193,22 @@ class DependencyAnalyzer(object):
                 else:
                     raise
             solv_repo = self.pool.add_repo(repo.name)
-            # solv.xfopen does not accept unicode filenames on Python 2
-            solv_repo.add_rpmmd(solv.xfopen_fd(str(repo.primary_url), repo.primary.fileno()),
+            solv_repo.add_rpmmd(solv.xfopen_fd(repo.primary_url, repo.primary.fileno()),
                     None)
-            solv_repo.add_rpmmd(solv.xfopen_fd(str(repo.filelists_url), repo.filelists.fileno()),
-                    None, solv.Repo.REPO_EXTEND_SOLVABLES)
+            self._pending_filelists.append((solv_repo, repo))
             self.repos_by_name[repo.name] = repo
 
-        self.pool.addfileprovides()
+        file_deps = self.pool.addfileprovides_queue()
         self.pool.createwhatprovides()
+        # Packages under test always have their complete file lists loaded, 
+        # so they do not count here. Otherwise they could hide providers in 
+        # the repos which are only listed in filelists.
+        if any(all(provider in self._solvables_set
+                   for provider in self.pool.whatprovides(dep))
+               for dep in file_deps):
+            logger.debug('Some file dependencies are not satisfied by primary '
+                    'repodata, loading filelists')
+            self._load_filelists()
 
         # Special handling for "installonly" packages: we create jobs to mark 
         # installonly package names as "multiversion" and then set those as 
@@ -156,6 +220,27 @@ class DependencyAnalyzer(object):
             multiversion_jobs.extend(selection.jobs(solv.Job.SOLVER_MULTIVERSION))
         self.pool.setpooljobs(multiversion_jobs)
 
+        # Every check (apart from the upgrade check, which needs a solver 
+        # configured differently) reuses this one solver. Each call to 
+        # solve() starts from scratch, so there is no need to pay for 
+        # constructing a new solver each time.
+        self._solver = self.pool.Solver()
+
+        # Conflict checking asks the same installability questions many times 
+        # over, so remember the answers. Keyed by solvable id (for single 
+        # packages) or frozenset of solvable ids (for pairs).
+        self._installable_cache = {}
+        self._installable_together_cache = {}
+        # File info read from package files during conflict checking, keyed 
+        # by path, see _read_rpm_file_info()
+        self._rpm_file_info = {}
+        # Index of files in the packages under test, see _find_file_owners()
+        self._file_owners = None
+        # Local paths of packages already downloaded, keyed by solvable id
+        self._package_paths = {}
+        # String representations of solvables, keyed by solvable id
+        self._solvable_strs = {}
+
     # Context manager protocol is only implemented for backwards compatibility.
     # There are actually no resources to acquire or release.
 
@@ -165,39 +250,246 @@ class DependencyAnalyzer(object):
     def __exit__(self, type, value, tb):
         return
 
+    def _download_all_repodata(self, repos):
+        """
+        Downloads the repodata for all the given repos in parallel, and 
+        returns a list of finished futures in the same order as *repos*.
+
+        As soon as any repo fails to download (other than one which can be 
+        skipped), or if we are interrupted, the remaining downloads are 
+        cancelled and the exception is raised without waiting for them.
+        """
+        # delayed import to avoid circular dependency
+        from rpmdeplint.repodata import RepoDownloadError
+        cancelled = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, min(8, len(repos))))
+        downloads = []
+        try:
+            for repo in repos:
+                downloads.append(executor.submit(repo.download_repodata,
+                        clean=False, cancelled=cancelled))
+            pending = downloads
+            while pending:
+                done, pending = concurrent.futures.wait(pending,
+                        return_when=concurrent.futures.FIRST_EXCEPTION)
+                for repo, download in zip(repos, downloads):
+                    if download not in done or download.exception() is None:
+                        continue
+                    if not (isinstance(download.exception(), RepoDownloadError)
+                            and repo.skip_if_unavailable):
+                        download.result()
+            return downloads
+        except BaseException:
+            cancelled.set()
+            for download in downloads:
+                download.cancel()
+            raise
+        finally:
+            # Downloads still running have been told to stop, no need to wait
+            executor.shutdown(wait=False)
+
+    def _load_filelists(self):
+        for solv_repo, repo in self._pending_filelists:
+            solv_repo.add_rpmmd(solv.xfopen_fd(repo.filelists_url, repo.filelists.fileno()),
+                    None, solv.Repo.REPO_EXTEND_SOLVABLES)
+        self._pending_filelists = []
+        self.pool.addfileprovides()
+        self.pool.createwhatprovides()
+
+    def _ensure_filelists(self):
+        """
+        Loads the filelists for all repos, if they were not loaded already.
+        """
+        if not self._pending_filelists:
+            return
+        logger.debug('Loading filelists')
+        self._load_filelists()
+        # The extra file provides can change the solver's answers, so start 
+        # again with a fresh solver and forget anything we have cached.
+        self._solver = self.pool.Solver()
+        self._installable_cache.clear()
+        self._installable_together_cache.clear()
+
+    @_cached('_solvable_strs', lambda solvable: solvable.id)
+    def _solvable_str(self, solvable):
+        """
+        Returns the string representation (NEVRA) of the given solvable. 
+        These are cached because formatting them through libsolv is not free 
+        and the same solvables show up over and over again in dependency 
+        lists and problem messages.
+        """
+        return str(solvable)
+
+    @_cached('_package_paths', lambda solvable: solvable.id)
     def download_package(self, solvable):
-        if solvable in self.solvables:
+        if solvable in self._solvables_set:
             # It's a package under test, nothing to download
             return solvable.lookup_location()[0]
         href = solvable.lookup_location()[0]
-        baseurl = solvable.lookup_str(self.pool.str2id('solvable:mediabase'))
+        baseurl = solvable.lookup_str(self._mediabase_key)
         repo = self.repos_by_name[solvable.repo.name]
-        checksum = solvable.lookup_checksum(self.pool.str2id('solvable:checksum'))
+        checksum = solvable.lookup_checksum(self._checksum_key)
         return repo.download_package(href, baseurl,
                 checksum_type=checksum.typestr(),
                 checksum=checksum.hex())
 
-    def try_to_install_all(self):
+    def try_to_install_all(self, combined=False, processes=None):
         """
         Try to solve the goal of installing each of the packages under test,
         starting from an empty package set.
 
+        :param combined: If True, first try to solve the installation of all 
+                         the packages under test together in a single solver 
+                         run, which is much faster when there are many 
+                         packages. If that fails, each package is solved 
+                         separately as usual so that problems are attributed 
+                         to the right package. Each package's dependencies 
+                         are worked out by following requires and recommends 
+                         only, so packages pulled in by Supplements or 
+                         Enhances are not attributed to any package. If the 
+                         combined solve installs more than one provider of 
+                         a requirement (because another package under test 
+                         needs a different one), every installed provider is 
+                         attributed to each package with that requirement. 
+                         So a package can be listed with more dependencies 
+                         than when it is solved separately.
+        :param processes: If greater than 1, solve each package separately 
+                          using this many forked worker processes. Do not use 
+                          this if the calling application runs threads of its 
+                          own, because forking a multi-threaded process is 
+                          unsafe.
         :return: Tuple of (bool ok?, :py:class:`DependencySet`)
         """
-        solver = self.pool.Solver()
+        if combined:
+            ds = self._try_to_install_combined()
+            if ds is not None:
+                return True, ds
+        if processes is not None and processes > 1 and len(self.solvables) > 1:
+            results = self._try_to_install_in_workers(processes)
+        else:
+            results = [self._try_to_install(solvable) for solvable in self.solvables]
         ds = DependencySet()
-        for solvable in self.solvables:
-            logger.debug('Solving install jobs for %s', solvable)
-            jobs = solvable.Selection().jobs(solv.Job.SOLVER_INSTALL)
-            problems = solver.solve(jobs)
-            if problems:
-                ds.add_package(solvable, [], [six.text_type(p) for p in problems])
-            else:
-                ds.add_package(solvable, solver.transaction().newsolvables(), [])
+        for solvable, (dependencies, problems) in zip(self.solvables, results):
+            ds.add_package(self._solvable_str(solvable), dependencies, problems)
 
         ok = len(ds.overall_problems) == 0
         return ok, ds
 
+    def _try_to_install(self, solvable):
+        """
+        Solves the installation of the given package on its own.
+
+        :return: Tuple of (list of str dependencies, list of str problems)
+        """
+        logger.debug('Solving install jobs for %s', solvable)
+        jobs = solvable.Selection().jobs(solv.Job.SOLVER_INSTALL)
+        problems = self._solver.solve(jobs)
+        if problems:
+            return [], [str(p) for p in problems]
+        return [self._solvable_str(s) for s in self._solver.transaction().newsolvables()], []
+
+    def _try_to_install_in_workers(self, processes):
+        """
+        Like calling :py:meth:`_try_to_install` for each package under test, 
+        but spread across forked worker processes.
+
+        The libsolv bindings hold the GIL while solving and a pool cannot be 
+        shared between threads, so we use processes instead. Each worker is 
+        forked with its own copy of the pool and only the resulting strings 
+        are sent back. If a worker dies before sending its results, 
+        RuntimeError is raised.
+
+        Forking copies only the calling thread, so this is unsafe if the 
+        application calling us runs threads of its own which might be holding 
+        locks at the time.
+        """
+        # The workers rely on inheriting the pool, so they must be forked
+        context = multiprocessing.get_context('fork')
+        processes = min(processes, len(self.solvables))
+        workers = []
+        try:
+            for n in range(processes):
+                # Each pipe is created just before its worker is forked, and 
+                # our copy of the sending end is closed straight after, so that 
+                # no other process holds it. Then if the worker dies, 
+                # receiving from the pipe fails instead of blocking forever.
+                reader, writer = context.Pipe(duplex=False)
+                worker = context.Process(target=self._try_to_install_in_worker,
+                        args=(range(n, len(self.solvables), processes), writer))
+                worker.start()
+                writer.close()
+                workers.append((worker, reader))
+            results = [None] * len(self.solvables)
+            for worker, reader in workers:
+                try:
+                    worker_results = reader.recv()
+                except EOFError:
+                    worker.join()
+                    raise RuntimeError('Worker process %s exited with code %s '
+                            'before returning its results' % (worker.pid, worker.exitcode))
+                for index, result in worker_results:
+                    results[index] = result
+            return results
+        finally:
+            for worker, reader in workers:
+                reader.close()
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+    def _try_to_install_in_worker(self, indices, conn):
+        """
+        Runs in a worker process forked by :py:meth:`_try_to_install_in_workers`.
+        """
+        conn.send([(index, self._try_to_install(self.solvables[index]))
+                   for index in indices])
+        conn.close()
+
+    def _try_to_install_combined(self):
+        """
+        Solves the installation of all packages under test in one go. Returns 
+        a :py:class:`DependencySet` if successful, or None if there were 
+        problems.
+        """
+        logger.debug('Solving combined install jobs for all packages under test')
+        jobs = []
+        for solvable in self.solvables:
+            jobs.extend(solvable.Selection().jobs(solv.Job.SOLVER_INSTALL))
+        problems = self._solver.solve(jobs)
+        if problems:
+            logger.debug('Combined solve failed, solving each package separately: %s',
+                    problems[0])
+            return None
+        installed = set(self._solver.transaction().newsolvables())
+        ds = DependencySet()
+        for solvable in self.solvables:
+            ds.add_package(self._solvable_str(solvable),
+                    [self._solvable_str(s) for s in self._dependency_closure(solvable, installed)],
+                    [])
+        return ds
+
+    def _dependency_closure(self, solvable, installed):
+        """
+        Returns the list of solvables from *installed* which are reachable 
+        from the given solvable (including itself) by following its requires 
+        and recommends. Every installed provider of a requirement is 
+        followed, not only the one the solver picked to satisfy it.
+        """
+        keys = [self._requires_key, self._recommends_key]
+        seen = set([solvable])
+        todo = [solvable]
+        while todo:
+            s = todo.pop()
+            for key in keys:
+                # marker=0 means we get pre-requires as well as regular requires
+                for dep in s.lookup_deparray(key, 0):
+                    for provider in self.pool.whatprovides(dep):
+                        if provider in installed and provider not in seen:
+                            seen.add(provider)
+                            todo.append(provider)
+        return sorted(seen, key=lambda s: s.id)
+
     def _select_obsoleted_by(self, solvables):
         """
         Returns a solv.Selection matching every solvable which is "obsoleted" 
@@ -207,16 +499,30 @@ class DependencyAnalyzer(object):
         """
         # Start with an empty selection.
         sel = self.pool.Selection()
+        # Find the newest of the given solvables for each name and arch, and 
+        # select every solvable matching any of their obsoletes relationships 
+        # by name. Many packages share the same obsoletes, so each distinct 
+        # relationship is only selected once.
+        newest = {}
+        obsoletes_ids = set()
         for solvable in solvables:
-            # Select every solvable with the same name and lower EVR.
-            # XXX are there some special cases with arch-noarch upgrades which this does not handle?
-            sel.add(self.pool.select('{}.{} < {}'.format(solvable.name, solvable.arch, solvable.evr),
-                    solv.Selection.SELECTION_NAME |
-                    solv.Selection.SELECTION_DOTARCH |
-                    solv.Selection.SELECTION_REL))
-            for obsoletes_rel in solvable.lookup_deparray(self.pool.str2id('solvable:obsoletes')):
-                # Select every solvable matching the obsoletes relationship by name.
-                sel.add(obsoletes_rel.Selection_name())
+            key = (solvable.nameid, solvable.archid)
+            if key not in newest or solvable.evrcmp(newest[key]) > 0:
+                newest[key] = solvable
+            for obsoletes_rel in solvable.lookup_deparray(self._obsoletes_key):
+                if obsoletes_rel.id not in obsoletes_ids:
+                    obsoletes_ids.add(obsoletes_rel.id)
+                    sel.add(obsoletes_rel.Selection_name())
+        # Then select every solvable with the same name and arch as one of 
+        # those, and a lower EVR. This takes a single pass over the pool, 
+        # rather than one pool.select() query per given solvable.
+        # XXX are there some special cases with arch-noarch upgrades which this does not handle?
+        for candidate in self.pool.solvables:
+            newer = newest.get((candidate.nameid, candidate.archid))
+            if newer is None or not self.pool.isknownarch(candidate.archid):
+                continue
+            if candidate.evrcmp(newer) < 0:
+                sel.add_raw(solv.Job.SOLVER_SOLVABLE, candidate.id)
         return sel
 
     def find_repoclosure_problems(self):
@@ -232,40 +538,49 @@ class DependencyAnalyzer(object):
         :return: List of str problem descriptions if any problems were found
         """
         problems = []
-        solver = self.pool.Solver()
+        solver = self._solver
         # This selection matches packages obsoleted by our packages under test.
         obs_sel = self._select_obsoleted_by(self.solvables)
         # This selection matches packages obsoleted by other existing packages in the repo.
         existing_obs_sel = self._select_obsoleted_by(s for s in self.pool.solvables
                 if s.repo.name != '@commandline')
-        obsoleted = obs_sel.solvables() + existing_obs_sel.solvables()
-        logger.debug('Excluding the following obsoleted packages:\n%s',
-                '\n'.join('  {}'.format(s) for s in obsoleted))
+        # Packages under test are checked by the check-sat command instead, 
+        # and there is no reason to check obsoleted packages. This is checked 
+        # for every solvable in the pool below, so combine them into a single 
+        # set rather than scanning lists each time.
+        obsoleted = set(obs_sel.solvables())
+        obsoleted.update(existing_obs_sel.solvables())
+        skipped = self._solvables_set.union(obsoleted)
+        # Listing every obsoleted package can be expensive for large repos, 
+        # so only do it if the message is actually going to be logged.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Excluding the following obsoleted packages:\n%s',
+                    '\n'.join('  {}'.format(s)
+                               for s in sorted(obsoleted, key=lambda s: s.id)))
+        # The erase jobs are the same for every package we check, so build 
+        # them once here instead of once (or twice) per package.
+        obs_erase_jobs = obs_sel.jobs(solv.Job.SOLVER_ERASE)
+        existing_obs_erase_jobs = existing_obs_sel.jobs(solv.Job.SOLVER_ERASE)
         for solvable in self.pool.solvables:
-            if solvable in self.solvables:
-                continue # checked by check-sat command instead
-            if solvable in obsoleted:
-                continue # no reason to check it
+            if solvable in skipped:
+                continue
             if not self.pool.isknownarch(solvable.archid):
-                logger.debug(
-                    'Skipping requirements for package {} arch does not match '
-                    'Architecture under test'.format(six.text_type(solvable)))
+                logger.debug('Skipping requirements for package %s arch does not match '
+                        'Architecture under test', solvable)
                 continue
             logger.debug('Checking requires for %s', solvable)
             # XXX limit available packages to compatible arches?
             # (use libsolv archpolicies somehow)
-            jobs = (solvable.Selection().jobs(solv.Job.SOLVER_INSTALL) +
-                    obs_sel.jobs(solv.Job.SOLVER_ERASE) +
-                    existing_obs_sel.jobs(solv.Job.SOLVER_ERASE))
+            install_jobs = solvable.Selection().jobs(solv.Job.SOLVER_INSTALL)
+            jobs = install_jobs + obs_erase_jobs + existing_obs_erase_jobs
             solver_problems = solver.solve(jobs)
             if solver_problems:
-                problem_msgs = [six.text_type(p) for p in solver_problems]
+                problem_msgs = [str(p) for p in solver_problems]
                 # If it's a pre-existing problem with repos (that is, the 
                 # problem also exists when the packages under test are 
                 # excluded) then warn about it here but don't consider it 
                 # a problem.
-                jobs = (solvable.Selection().jobs(solv.Job.SOLVER_INSTALL) +
-                        existing_obs_sel.jobs(solv.Job.SOLVER_ERASE))
+                jobs = install_jobs + existing_obs_erase_jobs
                 existing_problems = solver.solve(jobs)
                 if existing_problems:
                     for p in existing_problems:
@@ -275,38 +590,61 @@ class DependencyAnalyzer(object):
         return problems
 
     def _files_in_solvable(self, solvable):
-        iterator = solvable.Dataiterator(self.pool.str2id('solvable:filelist'), None,
+        iterator = solvable.Dataiterator(self._filelist_key, None,
                 solv.Dataiterator.SEARCH_FILES | solv.Dataiterator.SEARCH_COMPLETE_FILELIST)
         return [match.str for match in iterator]
 
+    @_cached('_installable_cache', lambda solvable: solvable.id)
+    def _package_can_be_installed(self, solvable):
+        """
+        Returns True if the given package can be installed on its own.
+        """
+        problems = self._solver.solve(solvable.Selection().jobs(solv.Job.SOLVER_INSTALL))
+        if problems:
+            logger.warn('Ignoring conflict candidate %s '
+                    'with pre-existing dependency problems: %s',
+                    solvable, problems[0])
+        return not problems
+
+    @_cached('_installable_together_cache',
+             lambda left, right: frozenset([left.id, right.id]))
     def _packages_can_be_installed_together(self, left, right):
         """
         Returns True if the given packages can be installed together.
         """
-        solver = self.pool.Solver()
-        left_install_jobs = left.Selection().jobs(solv.Job.SOLVER_INSTALL)
-        right_install_jobs = right.Selection().jobs(solv.Job.SOLVER_INSTALL)
         # First check if each one can be installed on its own. If either of 
         # these fails it is a warning, because it means we have no way to know 
         # if they can be installed together or not.
-        problems = solver.solve(left_install_jobs)
-        if problems:
-            logger.warn('Ignoring conflict candidate %s '
-                    'with pre-existing dependency problems: %s',
-                    left, problems[0])
+        if not self._package_can_be_installed(left) or \
+                not self._package_can_be_installed(right):
             return False
-        problems = solver.solve(right_install_jobs)
-        if problems:
-            logger.warn('Ignoring conflict candidate %s '
-                    'with pre-existing dependency problems: %s',
-                    right, problems[0])
-            return False
-        problems = solver.solve(left_install_jobs + right_install_jobs)
+        jobs = (left.Selection().jobs(solv.Job.SOLVER_INSTALL) +
+                right.Selection().jobs(solv.Job.SOLVER_INSTALL))
+        problems = self._solver.solve(jobs)
         if problems:
             logger.debug('Conflict candidates %s and %s cannot be installed together: %s',
                     left, right, problems[0])
-            return False
-        return True
+        return not problems
+
+    def _read_rpm_header(self, path):
+        ts = rpm.TransactionSet()
+        ts.setVSFlags(rpm._RPMVSF_NOSIGNATURES)
+        with open(path, 'rb') as f:
+            return ts.hdrFromFdno(f)
+
+    @_cached('_rpm_file_info', lambda path: path)
+    def _read_rpm_file_info(self, path):
+        """
+        Returns :py:class:`rpm.files` for the package at the given path, or 
+        its header on rpm 4.11 which lacks :py:class:`rpm.files`. The result 
+        is cached (until the end of :py:meth:`find_conflicts`), because 
+        conflict checking may need to look at the same package once for 
+        every file it shares with another package.
+        """
+        header = self._read_rpm_header(path)
+        if hasattr(rpm, 'files'):
+            return rpm.files(header)
+        return header
 
     def _file_conflict_is_permitted(self, left, right, filename):
         """
@@ -316,13 +654,8 @@ class DependencyAnalyzer(object):
         if not hasattr(rpm, 'files'):
             return self._file_conflict_is_permitted_rpm411(left, right, filename)
 
-        ts = rpm.TransactionSet()
-        ts.setVSFlags(rpm._RPMVSF_NOSIGNATURES)
-
-        left_hdr = ts.hdrFromFdno(open(left.lookup_location()[0], 'rb'))
-        right_hdr = ts.hdrFromFdno(open(self.download_package(right), 'rb'))
-        left_files = rpm.files(left_hdr)
-        right_files = rpm.files(right_hdr)
+        left_files = self._read_rpm_file_info(left.lookup_location()[0])
+        right_files = self._read_rpm_file_info(self.download_package(right))
         if left_files[filename].matches(right_files[filename]):
             logger.debug('Conflict on %s between %s and %s permitted because files match',
                     filename, left, right)
@@ -346,11 +679,8 @@ class DependencyAnalyzer(object):
         _rpm.fiFromFi.argtypes = [ctypes.py_object]
         _rpm.fiFromFi.restype = ctypes.POINTER(rpmfi_s)
 
-        ts = rpm.TransactionSet()
-        ts.setVSFlags(rpm._RPMVSF_NOSIGNATURES)
-
-        left_hdr = ts.hdrFromFdno(open(left.lookup_location()[0], 'rb'))
-        right_hdr = ts.hdrFromFdno(open(self.download_package(right), 'rb'))
+        left_hdr = self._read_rpm_file_info(left.lookup_location()[0])
+        right_hdr = self._read_rpm_file_info(self.download_package(right))
         left_fi = rpm.fi(left_hdr)
         try:
             while left_fi.FN() != filename:
@@ -373,6 +703,35 @@ class DependencyAnalyzer(object):
             return True
         return False
 
+    def _find_file_owners(self):
+        """
+        Returns a dict of {filename: list of solvables owning that file}, for 
+        every filename in the packages under test. Solvables are listed in 
+        pool order. The index is built on first use and then reused.
+        """
+        if self._file_owners is not None:
+            return self._file_owners
+        self._ensure_filelists()
+        all_filenames = set()
+        for solvable in self.solvables:
+            all_filenames.update(self._files_in_solvable(solvable))
+        # In libsolv, iterating all solvables is fast, and listing all 
+        # files in a solvable is fast, but finding solvables which contain 
+        # a given file is *very slow* (see bug 1465736).
+        # Hence this approach, where we visit each solvable once and use 
+        # Python set operations to look for any overlapping filenames. Most 
+        # solvables in the pool have no files in common with the packages 
+        # under test, so they are ruled out with a single set operation.
+        file_owners = defaultdict(list)
+        for owner in self.pool.solvables:
+            owner_filenames = self._files_in_solvable(owner)
+            if all_filenames.isdisjoint(owner_filenames):
+                continue
+            for filename in all_filenames.intersection(owner_filenames):
+                file_owners[filename].append(owner)
+        self._file_owners = dict(file_owners)
+        return self._file_owners
+
     def find_conflicts(self):
         """
         Find undeclared file conflicts in the packages under test.
@@ -380,45 +739,52 @@ class DependencyAnalyzer(object):
         :return: List of str describing each conflict found
                  (or empty list if no conflicts were found)
         """
-        solver = self.pool.Solver()
+        file_owners = self._find_file_owners()
         problems = []
-        for solvable in self.solvables:
-            logger.debug('Checking all files in %s for conflicts', solvable)
-            filenames = set(self._files_in_solvable(solvable))
-            # In libsolv, iterating all solvables is fast, and listing all 
-            # files in a solvable is fast, but finding solvables which contain 
-            # a given file is *very slow* (see bug 1465736).
-            # Hence this approach, where we visit each solvable and use Python 
-            # set operations to look for any overlapping filenames.
-            for conflicting in self.pool.solvables:
-                if conflicting == solvable:
-                    continue
-                conflict_filenames = filenames.intersection(self._files_in_solvable(conflicting))
-                if not conflict_filenames:
-                    continue
-                if not self._packages_can_be_installed_together(solvable, conflicting):
-                    continue
-                for filename in conflict_filenames:
-                    logger.debug('Considering conflict on %s with %s', filename, conflicting)
-                    if not self._file_conflict_is_permitted(solvable, conflicting, filename):
-                        msg = u'{} provides {} which is also provided by {}'.format(
-                            six.text_type(solvable), filename, six.text_type(conflicting))
-                        problems.append(msg)
-                    if conflicting not in self.solvables:
-                        # For each filename we are checking, we only want to 
-                        # check at most *one* package from the remote 
-                        # repositories. This is purely an optimization to save 
-                        # network bandwidth and time. We *are* potentially 
-                        # missing some real conflicts by doing this, but the 
-                        # cost of downloading every package in the distro for 
-                        # common directories like /usr/lib/debug is too high.
-                        # Note however that we do always ensure at least one 
-                        # *remote* candidate is checked (that is, not from the 
-                        # set of packages under test) to catch problems like 
-                        # bug 1502458.
-                        logger.debug('Skipping further checks on %s '
-                                'to save network bandwidth', filename)
-                        filenames.remove(filename)
+        try:
+            for solvable in self.solvables:
+                logger.debug('Checking all files in %s for conflicts', solvable)
+                filenames = set(self._files_in_solvable(solvable))
+                # Group the filenames by the other solvables which also own them.
+                filenames_by_conflicting = defaultdict(list)
+                for filename in filenames:
+                    for conflicting in file_owners.get(filename, ()):
+                        if conflicting != solvable:
+                            filenames_by_conflicting[conflicting].append(filename)
+                # Visit the candidates in pool order, so that the choice of which 
+                # remote package is checked for each filename (see below) is 
+                # deterministic.
+                for conflicting in sorted(filenames_by_conflicting, key=lambda s: s.id):
+                    conflict_filenames = filenames.intersection(filenames_by_conflicting[conflicting])
+                    if not conflict_filenames:
+                        continue
+                    if not self._packages_can_be_installed_together(solvable, conflicting):
+                        continue
+                    for filename in conflict_filenames:
+                        logger.debug('Considering conflict on %s with %s', filename, conflicting)
+                        if not self._file_conflict_is_permitted(solvable, conflicting, filename):
+                            msg = '{} provides {} which is also provided by {}'.format(
+                                self._solvable_str(solvable), filename,
+                                self._solvable_str(conflicting))
+                            problems.append(msg)
+                        if conflicting not in self._solvables_set:
+                            # For each filename we are checking, we only want to 
+                            # check at most *one* package from the remote 
+                            # repositories. This is purely an optimization to save 
+                            # network bandwidth and time. We *are* potentially 
+                            # missing some real conflicts by doing this, but the 
+                            # cost of downloading every package in the distro for 
+                            # common directories like /usr/lib/debug is too high.
+                            # Note however that we do always ensure at least one 
+                            # *remote* candidate is checked (that is, not from the 
+                            # set of packages under test) to catch problems like 
+                            # bug 1502458.
+                            logger.debug('Skipping further checks on %s '
+                                    'to save network bandwidth', filename)
+                            filenames.remove(filename)
+        finally:
+            # Only keep the package file info around while we need it
+            self._rpm_file_info.clear()
         return sorted(problems)
 
     def find_upgrade_problems(self):
@@ -448,15 +814,17 @@ class DependencyAnalyzer(object):
             problems = []
             for solvable in self.solvables:
                 action = transaction.steptype(solvable, transaction.SOLVER_TRANSACTION_SHOW_OBSOLETES)
-                other = transaction.othersolvable(solvable)
                 if action == transaction.SOLVER_TRANSACTION_IGNORE:
                     continue # it's kept, so no problem here
-                elif action == transaction.SOLVER_TRANSACTION_UPGRADED:
-                    problems.append(u'{} would be upgraded by {} from repo {}'.format(
-                            six.text_type(solvable), six.text_type(other), other.repo.name))
+                other = transaction.othersolvable(solvable)
+                if action == transaction.SOLVER_TRANSACTION_UPGRADED:
+                    problems.append('{} would be upgraded by {} from repo {}'.format(
+                            self._solvable_str(solvable), self._solvable_str(other),
+                            other.repo.name))
                 elif action == transaction.SOLVER_TRANSACTION_OBSOLETED:
-                    problems.append(u'{} would be obsoleted by {} from repo {}'.format(
-                            six.text_type(solvable), six.text_type(other), other.repo.name))
+                    problems.append('{} would be obsoleted by {} from repo {}'.format(
+                            self._solvable_str(solvable), self._solvable_str(other),
+                            other.repo.name))
                 else:
                     raise RuntimeError('Unrecognised transaction step type %s' % action)
             return problems
@@ -4,8 +4,6 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from __future__ import absolute_import
-
 import sys
 import logging
 import argparse
@@ -26,26 +24,26 @@ def cmd_check(args):
         logger.debug('Performing satisfiability check (check-sat)')
         ok, result = analyzer.try_to_install_all()
         if not ok:
-            sys.stderr.write(u'Problems with dependency set:\n')
-            sys.stderr.write(u'\n'.join(result.overall_problems) + u'\n')
+            sys.stderr.write('Problems with dependency set:\n')
+            sys.stderr.write('\n'.join(result.overall_problems) + '\n')
             failed = True
         logger.debug('Performing repoclosure check (check-repoclosure)')
         problems = analyzer.find_repoclosure_problems()
         if problems:
-            sys.stderr.write(u'Dependency problems with repos:\n')
-            sys.stderr.write(u'\n'.join(problems) + u'\n')
+            sys.stderr.write('Dependency problems with repos:\n')
+            sys.stderr.write('\n'.join(problems) + '\n')
             failed = True
         logger.debug('Performing file conflict check (check-conflicts)')
         conflicts = analyzer.find_conflicts()
         if conflicts:
-            sys.stderr.write(u'Undeclared file conflicts:\n')
-            sys.stderr.write(u'\n'.join(conflicts) + u'\n')
+            sys.stderr.write('Undeclared file conflicts:\n')
+            sys.stderr.write('\n'.join(conflicts) + '\n')
             failed = True
         logger.debug('Performing upgrade check (check-upgrade)')
         problems = analyzer.find_upgrade_problems()
         if problems:
-            sys.stderr.write(u'Upgrade problems:\n')
-            sys.stderr.write(u'\n'.join(problems) + u'\n')
+            sys.stderr.write('Upgrade problems:\n')
+            sys.stderr.write('\n'.join(problems) + '\n')
             failed = True
     return 3 if failed else 0
 
@@ -59,8 +57,8 @@ def cmd_check_sat(args):
         ok, result = analyzer.try_to_install_all()
 
         if not ok:
-            sys.stderr.write(u'Problems with dependency set:\n')
-            sys.stderr.write(u'\n'.join(result.overall_problems) + u'\n')
+            sys.stderr.write('Problems with dependency set:\n')
+            sys.stderr.write('\n'.join(result.overall_problems) + '\n')
             return 3
     return 0
 
@@ -73,8 +71,8 @@ def cmd_check_repoclosure(args):
     with dependency_analyzer_from_args(args) as analyzer:
         problems = analyzer.find_repoclosure_problems()
     if problems:
-        sys.stderr.write(u'Dependency problems with repos:\n')
-        sys.stderr.write(u'\n'.join(problems) + u'\n')
+        sys.stderr.write('Dependency problems with repos:\n')
+        sys.stderr.write('\n'.join(problems) + '\n')
         return 3
     return 0
 
@@ -86,8 +84,8 @@ def cmd_check_conflicts(args):
     with dependency_analyzer_from_args(args) as analyzer:
         conflicts = analyzer.find_conflicts()
     if conflicts:
-        sys.stderr.write(u'Undeclared file conflicts:\n')
-        sys.stderr.write(u'\n'.join(conflicts) + u'\n')
+        sys.stderr.write('Undeclared file conflicts:\n')
+        sys.stderr.write('\n'.join(conflicts) + '\n')
         return 3
     return 0
 
@@ -100,8 +98,8 @@ def cmd_check_upgrade(args):
     with dependency_analyzer_from_args(args) as analyzer:
         problems = analyzer.find_upgrade_problems()
     if problems:
-        sys.stderr.write(u'Upgrade problems:\n')
-        sys.stderr.write(u'\n'.join(problems) + u'\n')
+        sys.stderr.write('Upgrade problems:\n')
+        sys.stderr.write('\n'.join(problems) + '\n')
         return 3
     return 0
 
@@ -115,16 +113,16 @@ def cmd_list_deps(args):
     with dependency_analyzer_from_args(args) as analyzer:
         ok, result = analyzer.try_to_install_all()
         if not ok:
-            sys.stderr.write(u'Problems with dependency set:\n')
-            sys.stderr.write(u'\n'.join(result.overall_problems) + u'\n')
+            sys.stderr.write('Problems with dependency set:\n')
+            sys.stderr.write('\n'.join(result.overall_problems) + '\n')
             return 3
 
     package_deps = result.package_dependencies
     for pkg in package_deps.keys():
         deps = package_deps[pkg]['dependencies']
-        sys.stdout.write(u"%s has %s dependencies:\n" % (pkg, len(deps)))
-        sys.stdout.write(u"\n".join(["\t" + x for x in deps]))
-        sys.stdout.write(u"\n\n")
+        sys.stdout.write("%s has %s dependencies:\n" % (pkg, len(deps)))
+        sys.stdout.write("\n".join(["\t" + x for x in deps]))
+        sys.stdout.write("\n\n")
     return 0
 
 
@@ -4,13 +4,8 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-from __future__ import absolute_import
-
 import os
-try:
-    from os import scandir # Python 3.5+
-except ImportError:
-    from scandir import scandir
+from os import scandir
 import shutil
 import logging
 import tempfile
@@ -18,16 +13,35 @@ import requests
 import errno
 import glob
 import time
-from six.moves import configparser
+import threading
+import configparser
 import librepo
 
 logger = logging.getLogger(__name__)
-requests_session = requests.Session()
+
+# requests.Session is not documented as thread-safe, and repodata for 
+# several repos may be downloaded concurrently, so each thread gets its own.
+_thread_local = threading.local()
+
+
+def get_requests_session():
+    try:
+        return _thread_local.requests_session
+    except AttributeError:
+        session = _thread_local.requests_session = requests.Session()
+        return session
 
 
 REPO_CACHE_DIR = os.path.join(os.sep, 'var', 'tmp')
 REPO_CACHE_NAME_PREFIX = 'rpmdeplint-'
 
+# Interruptible librepo handles install their own SIGINT handler for the 
+# duration of each download and restore the previous one afterwards. That is 
+# not safe to do from more than one thread at a time, so all librepo downloads 
+# are serialized with this lock. The repodata files themselves are downloaded 
+# using requests (with a session per thread) so those can run in parallel.
+librepo_lock = threading.Lock()
+
 
 class PackageDownloadError(Exception):
     """
@@ -170,8 +184,20 @@ class Repo(object):
         self.metalink = metalink
         self.skip_if_unavailable = skip_if_unavailable
 
-    def download_repodata(self):
-        clean_cache()
+    def download_repodata(self, clean=True, cancelled=None):
+        """
+        Downloads the repodata for this repo, or opens it from the cache.
+
+        :param clean: If true, expired entries are first removed from the 
+            cache by calling :py:func:`clean_cache`. Callers downloading 
+            several repos in parallel should pass False and clean the cache 
+            once beforehand.
+        :param cancelled: An optional :py:class:`threading.Event`. If it is 
+            set while a repodata file is being downloaded, the download is 
+            abandoned and :py:exc:`RepoDownloadError` is raised.
+        """
+        if clean:
+            clean_cache()
         logger.debug('Loading repodata for %s from %s', self.name,
             self.baseurl or self.metalink)
         self.librepo_handle = h = librepo.Handle()
@@ -197,18 +223,19 @@ class Repo(object):
             self._download_metadata_result(h, r)
             self._yum_repomd = r.yum_repomd
             self.primary = self._download_repodata_file(
-                self.primary_checksum, self.primary_url)
+                self.primary_checksum, self.primary_url, cancelled)
             self.filelists = self._download_repodata_file(
-                self.filelists_checksum, self.filelists_url)
+                self.filelists_checksum, self.filelists_url, cancelled)
 
     def _download_metadata_result(self, handle, result):
         try:
-            handle.perform(result)
+            with librepo_lock:
+                handle.perform(result)
         except librepo.LibrepoException as ex:
             raise RepoDownloadError('Failed to download repodata for %r: %s'
                     % (self, ex.args[1]))
 
-    def _download_repodata_file(self, checksum, url):
+    def _download_repodata_file(self, checksum, url, cancelled=None):
         """
         Each created file in cache becomes immutable, and is referenced in
         the directory tree within XDG_CACHE_HOME as
@@ -236,10 +263,7 @@ class Repo(object):
             logger.debug('Using cached file %s for %s', filepath_in_cache, url)
             # Bump the modtime on the cache file we are using,
             # since our cache expiry is LRU based on modtime.
-            if os.utime in getattr(os, 'supports_fd', []):
-                os.utime(f.fileno()) # Python 3.3+
-            else:
-                os.utime(filepath_in_cache, None)
+            os.utime(f.fileno())
             return f
         try:
             os.makedirs(os.path.dirname(filepath_in_cache))
@@ -255,9 +279,13 @@ class Repo(object):
             raise
         try:
             try:
-                response = requests_session.get(url, stream=True)
+                response = get_requests_session().get(url, stream=True)
                 response.raise_for_status()
                 for chunk in response.raw.stream(decode_content=False):
+                    if cancelled is not None and cancelled.is_set():
+                        response.close()
+                        raise RepoDownloadError('Download of repodata file %s for %r was cancelled'
+                                % (os.path.basename(url), self))
                     f.write(chunk)
                 response.close()
             except IOError as e:
@@ -286,7 +314,8 @@ class Repo(object):
                 checksum=checksum,
                 dest=self._root_path,
                 handle=self.librepo_handle)
-        librepo.download_packages([target])
+        with librepo_lock:
+            librepo.download_packages([target])
         if target.err and target.err == 'Already downloaded':
             logger.debug('Already downloaded %s', target.local_path)
         elif target.err:
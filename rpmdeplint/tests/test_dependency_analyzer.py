@@ -5,9 +5,10 @@
 # (at your option) any later version.
 
 import shutil
+import time
 from unittest import TestCase
 from rpmdeplint import DependencyAnalyzer
-from rpmdeplint.repodata import Repo
+from rpmdeplint.repodata import Repo, RepoDownloadError
 import os
 import rpmfluff
 
@@ -76,3 +77,207 @@ class TestDependencyAnalyzer(TestCase):
         self.assertEqual(True, ok)
         self.assertEqual(4, len(dependency_set.package_dependencies['lemon-meringue-pie-1-0.x86_64']['dependencies']))
         self.assertEqual(3, len(dependency_set.package_dependencies['apple-4.9-3.x86_64']['dependencies']))
+
+    def test_combined_install_matches_separate_install(self):
+        lemon = rpmfluff.SimpleRpmBuild('lemon', '1', '3', ['noarch'])
+        lemon.add_provides('lemon-juice')
+        self.addCleanup(shutil.rmtree, lemon.get_base_dir())
+        peeler = rpmfluff.SimpleRpmBuild('peeler', '4', '0', ['x86_64'])
+        self.addCleanup(shutil.rmtree, peeler.get_base_dir())
+        sugar = rpmfluff.SimpleRpmBuild('sugar', '4', '0', ['x86_64'])
+        self.addCleanup(shutil.rmtree, sugar.get_base_dir())
+        base_repo = rpmfluff.YumRepoBuild([lemon, peeler, sugar])
+        base_repo.make('x86_64', 'noarch')
+        self.addCleanup(shutil.rmtree, base_repo.repoDir)
+
+        apple = rpmfluff.SimpleRpmBuild('apple', '4.9', '3', ['x86_64'])
+        apple.add_requires('peeler')
+        apple.add_requires('lemon-juice')
+        apple.make()
+        self.addCleanup(shutil.rmtree, apple.get_base_dir())
+        lemonade = rpmfluff.SimpleRpmBuild('lemonade', '1', '0', ['x86_64'])
+        lemonade.add_requires('lemon-juice')
+        lemonade.add_requires('sugar')
+        lemonade.make()
+        self.addCleanup(shutil.rmtree, lemonade.get_base_dir())
+
+        da = DependencyAnalyzer(
+                repos=[Repo(repo_name='base', baseurl=base_repo.repoDir)],
+                packages=[apple.get_built_rpm('x86_64'),
+                          lemonade.get_built_rpm('x86_64')])
+
+        ok, separate = da.try_to_install_all()
+        self.assertEqual(True, ok)
+        ok, combined = da.try_to_install_all(combined=True)
+        self.assertEqual(True, ok)
+        self.assertEqual(separate.packages, combined.packages)
+        for pkg in separate.packages:
+            self.assertEqual(
+                    sorted(separate.package_dependencies[pkg]['dependencies']),
+                    sorted(combined.package_dependencies[pkg]['dependencies']))
+
+    def test_combined_install_lists_every_installed_provider(self):
+        lemon = rpmfluff.SimpleRpmBuild('lemon', '1', '3', ['noarch'])
+        lemon.add_provides('juice')
+        self.addCleanup(shutil.rmtree, lemon.get_base_dir())
+        orange = rpmfluff.SimpleRpmBuild('orange', '2', '0', ['noarch'])
+        orange.add_provides('juice')
+        self.addCleanup(shutil.rmtree, orange.get_base_dir())
+        base_repo = rpmfluff.YumRepoBuild([lemon, orange])
+        base_repo.make('noarch')
+        self.addCleanup(shutil.rmtree, base_repo.repoDir)
+
+        lemonade = rpmfluff.SimpleRpmBuild('lemonade', '1', '0', ['x86_64'])
+        lemonade.add_requires('juice')
+        lemonade.add_requires('lemon')
+        lemonade.make()
+        self.addCleanup(shutil.rmtree, lemonade.get_base_dir())
+        orangeade = rpmfluff.SimpleRpmBuild('orangeade', '1', '0', ['x86_64'])
+        orangeade.add_requires('juice')
+        orangeade.add_requires('orange')
+        orangeade.make()
+        self.addCleanup(shutil.rmtree, orangeade.get_base_dir())
+
+        da = DependencyAnalyzer(
+                repos=[Repo(repo_name='base', baseurl=base_repo.repoDir)],
+                packages=[lemonade.get_built_rpm('x86_64'),
+                          orangeade.get_built_rpm('x86_64')])
+
+        ok, separate = da.try_to_install_all()
+        self.assertEqual(True, ok)
+        self.assertEqual(['lemon-1-3.noarch', 'lemonade-1-0.x86_64'],
+                sorted(separate.package_dependencies['lemonade-1-0.x86_64']['dependencies']))
+        # Both providers of juice are installed by the combined solve, so 
+        # both are attributed to each package requiring juice.
+        ok, combined = da.try_to_install_all(combined=True)
+        self.assertEqual(True, ok)
+        self.assertEqual(['lemon-1-3.noarch', 'lemonade-1-0.x86_64', 'orange-2-0.noarch'],
+                sorted(combined.package_dependencies['lemonade-1-0.x86_64']['dependencies']))
+        self.assertEqual(['lemon-1-3.noarch', 'orange-2-0.noarch', 'orangeade-1-0.x86_64'],
+                sorted(combined.package_dependencies['orangeade-1-0.x86_64']['dependencies']))
+
+    def test_install_in_worker_processes(self):
+        lemon = rpmfluff.SimpleRpmBuild('lemon', '1', '3', ['noarch'])
+        lemon.add_provides('lemon-juice')
+        self.addCleanup(shutil.rmtree, lemon.get_base_dir())
+        base_repo = rpmfluff.YumRepoBuild([lemon])
+        base_repo.make('noarch')
+        self.addCleanup(shutil.rmtree, base_repo.repoDir)
+
+        lemonade = rpmfluff.SimpleRpmBuild('lemonade', '1', '0', ['x86_64'])
+        lemonade.add_requires('lemon-juice')
+        lemonade.make()
+        self.addCleanup(shutil.rmtree, lemonade.get_base_dir())
+        lemon_tart = rpmfluff.SimpleRpmBuild('lemon-tart', '1', '0', ['x86_64'])
+        lemon_tart.add_requires('lemon-juice')
+        lemon_tart.add_requires('pastry')
+        lemon_tart.make()
+        self.addCleanup(shutil.rmtree, lemon_tart.get_base_dir())
+
+        da = DependencyAnalyzer(
+                repos=[Repo(repo_name='base', baseurl=base_repo.repoDir)],
+                packages=[lemonade.get_built_rpm('x86_64'),
+                          lemon_tart.get_built_rpm('x86_64')])
+
+        ok, dependency_set = da.try_to_install_all(processes=2)
+        self.assertEqual(False, ok)
+        self.assertEqual(['lemon-1-3.noarch', 'lemonade-1-0.x86_64'],
+                sorted(dependency_set.package_dependencies['lemonade-1-0.x86_64']['dependencies']))
+        self.assertEqual(['nothing provides pastry needed by lemon-tart-1-0.x86_64'],
+                dependency_set.package_dependencies['lemon-tart-1-0.x86_64']['problems'])
+
+    def test_dead_worker_process_raises_error(self):
+        lemonade = rpmfluff.SimpleRpmBuild('lemonade', '1', '0', ['x86_64'])
+        lemonade.make()
+        self.addCleanup(shutil.rmtree, lemonade.get_base_dir())
+        lemon_tart = rpmfluff.SimpleRpmBuild('lemon-tart', '1', '0', ['x86_64'])
+        lemon_tart.make()
+        self.addCleanup(shutil.rmtree, lemon_tart.get_base_dir())
+
+        da = DependencyAnalyzer(repos=[],
+                packages=[lemonade.get_built_rpm('x86_64'),
+                          lemon_tart.get_built_rpm('x86_64')])
+        # The workers are forked, so they inherit this replacement
+        da._try_to_install = lambda solvable: os._exit(1)
+        with self.assertRaises(RuntimeError):
+            da.try_to_install_all(processes=2)
+
+    def test_file_dependency_only_in_filelists(self):
+        # /usr/lib/libfoo.so.1 does not match any of the patterns for files 
+        # listed in primary, so it only appears in filelists.
+        libfoo = rpmfluff.SimpleRpmBuild('libfoo', '1', '0', ['x86_64'])
+        libfoo.add_installed_file(installPath='usr/lib/libfoo.so.1',
+                sourceFile=rpmfluff.SourceFile('libfoo.so.1', 'libfoo\n'))
+        self.addCleanup(shutil.rmtree, libfoo.get_base_dir())
+        foo_tools = rpmfluff.SimpleRpmBuild('foo-tools', '1', '0', ['x86_64'])
+        foo_tools.add_requires('/usr/lib/libfoo.so.1')
+        self.addCleanup(shutil.rmtree, foo_tools.get_base_dir())
+        base_repo = rpmfluff.YumRepoBuild([libfoo, foo_tools])
+        base_repo.make('x86_64')
+        self.addCleanup(shutil.rmtree, base_repo.repoDir)
+
+        foo_gui = rpmfluff.SimpleRpmBuild('foo-gui', '1', '0', ['x86_64'])
+        foo_gui.add_requires('/usr/lib/libfoo.so.1')
+        foo_gui.make()
+        self.addCleanup(shutil.rmtree, foo_gui.get_base_dir())
+
+        da = DependencyAnalyzer(
+                repos=[Repo(repo_name='base', baseurl=base_repo.repoDir)],
+                packages=[foo_gui.get_built_rpm('x86_64')])
+
+        ok, dependency_set = da.try_to_install_all()
+        self.assertEqual(True, ok)
+        self.assertEqual(['foo-gui-1-0.x86_64', 'libfoo-1-0.x86_64'],
+                sorted(dependency_set.package_dependencies['foo-gui-1-0.x86_64']['dependencies']))
+        self.assertEqual([], da.find_repoclosure_problems())
+
+    def test_file_dependency_provided_by_package_under_test(self):
+        # The package under test also owns /usr/lib/libfoo.so.1, and its 
+        # complete file list is always loaded. That must not stop us from 
+        # seeing the repo package which owns the same file in filelists.
+        libfoo = rpmfluff.SimpleRpmBuild('libfoo', '1', '0', ['x86_64'])
+        libfoo.add_installed_file(installPath='usr/lib/libfoo.so.1',
+                sourceFile=rpmfluff.SourceFile('libfoo.so.1', 'libfoo\n'))
+        self.addCleanup(shutil.rmtree, libfoo.get_base_dir())
+        foo_tools = rpmfluff.SimpleRpmBuild('foo-tools', '1', '0', ['x86_64'])
+        foo_tools.add_requires('/usr/lib/libfoo.so.1')
+        self.addCleanup(shutil.rmtree, foo_tools.get_base_dir())
+        base_repo = rpmfluff.YumRepoBuild([libfoo, foo_tools])
+        base_repo.make('x86_64')
+        self.addCleanup(shutil.rmtree, base_repo.repoDir)
+
+        libfoo_compat = rpmfluff.SimpleRpmBuild('libfoo-compat', '1', '0', ['x86_64'])
+        libfoo_compat.add_installed_file(installPath='usr/lib/libfoo.so.1',
+                sourceFile=rpmfluff.SourceFile('libfoo.so.1', 'libfoo\n'))
+        libfoo_compat.make()
+        self.addCleanup(shutil.rmtree, libfoo_compat.get_base_dir())
+
+        da = DependencyAnalyzer(
+                repos=[Repo(repo_name='base', baseurl=base_repo.repoDir)],
+                packages=[libfoo_compat.get_built_rpm('x86_64')])
+
+        providers = da.pool.whatprovides(da.pool.Dep('/usr/lib/libfoo.so.1'))
+        self.assertEqual(['libfoo-1-0.x86_64', 'libfoo-compat-1-0.x86_64'],
+                sorted(str(p) for p in providers))
+        ok, dependency_set = da.try_to_install_all()
+        self.assertEqual(True, ok)
+        self.assertEqual([], da.find_repoclosure_problems())
+
+    def test_unreachable_repo_cancels_other_downloads(self):
+        class SlowRepo(Repo):
+            cancelled = None
+            def download_repodata(self, clean=True, cancelled=None):
+                # Stands in for a large download, which checks for 
+                # cancellation between chunks.
+                self.cancelled = cancelled
+                cancelled.wait(60)
+                raise RepoDownloadError('cancelled')
+
+        slow_repo = SlowRepo(repo_name='slow', baseurl='http://example.invalid/slow')
+        unreachable_repo = Repo(repo_name='dummy', baseurl='http://example.invalid/dummy')
+        start = time.time()
+        with self.assertRaises(RepoDownloadError) as rde:
+            DependencyAnalyzer(repos=[slow_repo, unreachable_repo], packages=[])
+        self.assertIn("repo_name='dummy'", str(rde.exception))
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(True, slow_repo.cancelled.is_set())
@@ -24,11 +24,11 @@ setup(name='rpmdeplint',
       author_email='qa-devel@lists.fedoraproject.org',
       classifiers=[
           'License :: OSI Approved :: GNU General Public License v2 or later (GPLv2+)',
-          'Programming Language :: Python :: 2.7',
           'Programming Language :: Python :: 3',
+          'Programming Language :: Python :: 3 :: Only',
       ],
       packages=['rpmdeplint', 'rpmdeplint.tests'],
-      install_requires=['six'],
+      python_requires='>=3.5',
       tests_require=['pytest'],
       data_files = [
           ('/usr/share/man/man1', glob('build/sphinx/man/*.1')),